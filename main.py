@@ -1,30 +1,88 @@
 import fitz  # PyMuPDF
-import pdfplumber
+import cv2
+import numpy as np
+import asyncio
 import io
 import os
 import subprocess
 import json
+import math
 import re
-from typing import Dict, List, Optional, Tuple
+import shutil
+import tempfile
+import threading
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Dict, List, Optional, Tuple
 from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi.responses import ORJSONResponse
+from numba import njit
 from pypdf import PdfReader
 from datetime import datetime
 
 
+'''Keep subset tags (e.g. "AAAAAH+") in font names so they match DEFAULT_FONTS_BANK_OF_AMERICAN'''
+fitz.TOOLS.set_subset_fontnames(True)
+MUPDF_FONT_NAME_LENGTH = 31
+FITZ_LOCK = threading.Lock()
+
 app = FastAPI(
     title="Advanced PDF Analysis API",
     description="Analyzes metadata, images, and internal structure of PDFs",
-    version="1.1.0"
+    version="1.1.0",
+    default_response_class=ORJSONResponse
 )
 
-DEFAULT_FONTS_BANK_OF_AMERICAN = [
+DEFAULT_FONTS_BANK_OF_AMERICAN = frozenset({
     "AAAAAH+ConnectionsIta_CZEX0AC0",
     "AAAAAB+ITC_Franklin_Gothic_Book_CZEX0080",
     "AAAAAD+HigherStandards_CZEX0660",
     "AAAAAL+ConnectionsBold_CZEX0AA0",
     "AAAAAJ+Connections_Medium_CZEX0A80",
     "AAAAAF+Connections_CZEX0A60"
-]
+})
+
+'''Lowercase names of editing tools looked for in the producer/creator metadata'''
+EDIT_SOFTWARES = ("acrobat", "photoshop", "word", "gimp", "illustrator")
+
+SUSPICIOUS_OBJECT_TYPES = frozenset({"/JavaScript", "/OpenAction"})
+
+RE_ACCOUNT_HOLDER = re.compile(r"^([A-Z\s]+)\nAccount summary", re.MULTILINE)
+RE_BEGINNING_BALANCE = re.compile(r"Beginning balance on .*? \$([\d,]+\.\d{2})")
+RE_DEPOSITS = re.compile(r"Deposits and other (?:additions|credits)\s+([\d,]+\.\d{2})")
+RE_CARD_WITHDRAWALS = re.compile(r"ATM and debit card subtractions\s+-([\d,]+\.\d{2})")
+RE_OTHER_SUBTRACTIONS = re.compile(r"Other subtractions\s+-([\d,]+\.\d{2})")
+RE_WITHDRAWALS = re.compile(r"Withdrawals and other debits\s+-([\d,]+\.\d{2})")
+RE_SERVICE_FEES = re.compile(r"Service fees\s+-([\d,]+\.\d{2})")
+RE_ENDING_BALANCE = re.compile(r"Ending balance on .*? \$([\d,]+\.\d{2})")
+RE_TOTAL_DEPOSITS = re.compile(r"Total deposits and other (?:additions|credits)\s+\$([\d,]+\.\d{2})")
+RE_TOTAL_CARD_WITHDRAWALS = re.compile(r"Total ATM and debit card subtractions\s+-\$([\d,]+\.\d{2})")
+RE_TOTAL_OTHER_WITHDRAWALS = re.compile(r"Total (?:other subtractions|withdrawals and other debits)\s+-\$([\d,]+\.\d{2})")
+RE_TRANSACTION = re.compile(r"^(\d{2}/\d{2}/\d{2})\s+.*?\s+(-?[\d,]+\.\d{2})$", re.MULTILINE)
+
+
+@njit(nogil=True, fastmath=True, cache=True)
+def ela_std_dev(img, compressed, scale):
+    """Fused absdiff, channel mean and standard deviation of the scaled ELA image."""
+    height, width, channels = img.shape
+    total = 0.0
+    total_sq = 0.0
+    for i in range(height):
+        for j in range(width):
+            pixel = 0.0
+            for c in range(channels):
+                pixel += abs(float(img[i, j, c]) - float(compressed[i, j, c]))
+            pixel /= channels
+            total += pixel
+            total_sq += pixel * pixel
+    count = height * width
+    mean = total / count
+    return math.sqrt(max(total_sq / count - mean * mean, 0.0)) * scale
+
+
+'''Compile (or load from cache) at import time so the first request doesn't pay for it'''
+ela_std_dev(np.zeros((1, 1, 3), np.uint8), np.zeros((1, 1, 3), np.uint8), 1.0)
 
 
 def analyze_image(image_data, quality=95, scale=15):
@@ -35,25 +93,33 @@ def analyze_image(image_data, quality=95, scale=15):
         if img is None:
             return {"error": "Unable to load image"}
 
-        with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as tmp:
-            cv2.imwrite(tmp.name, img, [cv2.IMWRITE_JPEG_QUALITY, quality])
-            compressed = cv2.imread(tmp.name)
-            os.unlink(tmp.name)
+        '''Icons, separators and spacers are too small to carry a meaningful ELA signal'''
+        height, width = img.shape[:2]
+        if height * width < 64 * 64:
+            return {
+                "image_stats": {
+                    "ela_std_dev": 0.0,
+                    "ela_shape": list(img.shape),
+                    "format": "JPEG"
+                },
+                "possible_manipulation": False,
+                "manipulation_note": "Image too small for ELA"
+            }
+
+        encoded, buffer = cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        compressed = cv2.imdecode(buffer, cv2.IMREAD_COLOR) if encoded else None
 
         if compressed is None:
             return {"error": "Error recompressing image"}
 
-        diff = cv2.absdiff(img, compressed)
-        ela = np.uint8(diff * scale)
-        ela_gray = cv2.cvtColor(ela, cv2.COLOR_BGR2GRAY)
-        std_dev = float(np.std(ela_gray))
+        std_dev = float(ela_std_dev(img, compressed, float(scale)))
         '''Adjustment for 20'''
         possible_manipulation = bool(std_dev > 20) 
 
         return {
             "image_stats": {
                 "ela_std_dev": std_dev,
-                "ela_shape": list(ela.shape),
+                "ela_shape": list(img.shape),
                 "format": "JPEG"
             },
             "possible_manipulation": possible_manipulation,
@@ -75,8 +141,8 @@ def extract_metadata(metadata):
         # revisions = len(reader.trailer.get("/Root", {}).get("/VersionHistory", []))
 
         edited_by_dates = mod_date != creation_date and mod_date != "Unknown"
-        edit_softwares = ["Acrobat", "Photoshop", "Word", "GIMP", "Illustrator"]
-        edited_by_software = any(software.lower() in str(producer + creator).lower() for software in edit_softwares)
+        haystack = f"{producer or ''} {creator or ''}".lower()
+        edited_by_software = any(software in haystack for software in EDIT_SOFTWARES)
 
         return {
             "metadata": {
@@ -114,71 +180,108 @@ def format_pdf_date(pdf_date: str) -> str:
         return pdf_date  
 
 
-def parse_pdf_low_level(pdf_path):
-    """Use pdfplumber to inspect internal structure and identify suspicious font positions."""
+def extract_page_text(page, y_tolerance=3):
+    """
+    Rebuilds the text of a page line by line, the way pdfplumber's extract_text does.
+
+    MuPDF starts a new line whenever characters on the same baseline are far apart, which
+    splits statement columns (date / description / amount) onto separate lines. Instead,
+    words whose tops are within y_tolerance of each other are grouped into one line,
+    ordered left to right and joined with spaces.
+    """
+    lines = []
+    last_top = None
+    for x0, top, _, _, word, *_ in sorted(page.get_text("words"), key=lambda w: (w[1], w[0])):
+        if last_top is None or top - last_top > y_tolerance:
+            lines.append([])
+        lines[-1].append((x0, word))
+        last_top = top
+    return "\n".join(" ".join(word for _, word in sorted(line)) for line in lines)
+
+
+def parse_pdf_low_level(doc):
+    """Use PyMuPDF to inspect internal structure and identify suspicious font positions."""
     try:
-        with pdfplumber.open(pdf_path) as pdf:
-            fonts = set()
-            suspicious_regions = []
-            for page_num, page in enumerate(pdf.pages, 1):
-                if page.chars:
-                    for char in page.chars:
-                        font = char.get("fontname", "unknown")
+        fonts = set()
+        suspicious_regions = []
+        suspicious_objects = False
+        for page_num, page in enumerate(doc, 1):
+            '''MuPDF cuts span font names to 31 chars; map them back to the full BaseFont of the page'''
+            full_font_names = {
+                basefont[:MUPDF_FONT_NAME_LENGTH]: basefont
+                for _, _, _, basefont, *_ in page.get_fonts()
+            }
+            for block in page.get_text("dict", flags=fitz.TEXTFLAGS_TEXT)["blocks"]:
+                for line in block.get("lines", ()):
+                    for span in line["spans"]:
+                        font = full_font_names.get(span["font"], span["font"])
                         fonts.add(font)
                         if font not in DEFAULT_FONTS_BANK_OF_AMERICAN:
-                            bbox = (
-                                char.get("x0", 0),
-                                char.get("top", 0),
-                                char.get("x1", 0),
-                                char.get("bottom", 0)
-                            )
+                            x0, top, x1, bottom = span["bbox"]
                             suspicious_regions.append({
                                 "page": page_num,
                                 "fontname": font,
-                                "bbox": bbox,  '''(x0, top, x1, bottom) - coordinates in PDF'''
-                                "text": char.get("text", ""),
-                                "width": char.get("width", 0),
-                                "height": char.get("height", 0)
+                                "bbox": (x0, top, x1, bottom),  # coordinates in PDF
+                                "text": span["text"],
+                                "width": x1 - x0,
+                                "height": bottom - top
                             })
-            
-            revisions = len(pdf.metadata.get("XMP:VersionHistory", [])) if pdf.metadata else 0
-            suspicious_objects = any(
-                obj.get("type") in ["/JavaScript", "/OpenAction"]
-                for page in pdf.pages
-                for obj in page.objects.get("xobject", {}).values()
-            )
 
-            num_suspicious_chars = len(suspicious_regions)
-
-            return {
-                "revisions": revisions,
-                "font_count": len(fonts),
-                "fonts_used": list(fonts),
-                "suspicious_regions": suspicious_regions,
-                "suspicious_objects": bool(suspicious_objects),
-                "note": (
-                    f"{len(fonts)} fonts detected; multiple fonts may indicate manipulation."
-                    f"Found {num_suspicious_chars} occurrences of suspicious fonts at specific positions."
-                    f"{'Suspicious objects found' if suspicious_regions or bool(suspicious_objects) else 'No suspicious objects'}."
-                )
-            }
-    except Exception as e:
-        return {"error": f"Error running pdfplumber: {str(e)}"}
+            if not suspicious_objects:
+                for xref, *_ in page.get_xobjects():
+                    if doc.xref_get_key(xref, "Type")[1] in SUSPICIOUS_OBJECT_TYPES:
+                        suspicious_objects = True
+                        break
 
+        revisions = max(doc.version_count - 1, 0)
 
-def highlight_suspicious_fonts(pdf_path, suspicious_regions, output_path="pdf_analysed.pdf"):
-    """Creates a copy of the PDF with highlights in the suspicious regions."""
-    doc = fitz.open(pdf_path)
+        num_suspicious_spans = len(suspicious_regions)
 
+        return {
+            "revisions": revisions,
+            "font_count": len(fonts),
+            "fonts_used": list(fonts),
+            "suspicious_regions": suspicious_regions,
+            "suspicious_objects": bool(suspicious_objects),
+            "note": (
+                f"{len(fonts)} fonts detected; multiple fonts may indicate manipulation."
+                f"Found {num_suspicious_spans} occurrences of suspicious fonts at specific positions."
+                f"{'Suspicious objects found' if suspicious_regions or bool(suspicious_objects) else 'No suspicious objects'}."
+            )
+        }
+    except Exception as e:
+        return {"error": f"Error running PyMuPDF: {str(e)}"}
+
+
+def merge_adjacent_rects(rects, max_gap=1.0):
+    """Coalesces rectangles that sit on the same text line and touch (or nearly touch) horizontally."""
+    merged = []
+    for rect in sorted(rects, key=lambda r: (r.y0, r.x0)):
+        if merged:
+            last = merged[-1]
+            overlap = min(last.y1, rect.y1) - max(last.y0, rect.y0)
+            same_line = overlap > 0.5 * min(last.height, rect.height)
+            if same_line and last.x0 <= rect.x0 <= last.x1 + max_gap:
+                merged[-1] = last | rect
+                continue
+        merged.append(rect)
+    return merged
+
+
+def highlight_suspicious_fonts(doc, suspicious_regions, output_path="pdf_analysed.pdf"):
+    """Saves a copy of the already open PDF with highlights in the suspicious regions."""
+    rects_by_page = defaultdict(list)
     for region in suspicious_regions:
-        page_num = region["page"] - 1 
         bbox = fitz.Rect(region["bbox"])
-        if bbox.is_valid:  
-            page = doc[page_num]
-            page.add_highlight_annot(bbox) 
+        if bbox.is_valid and not bbox.is_empty:
+            rects_by_page[region["page"] - 1].append(bbox)
+
+    for page_num, rects in rects_by_page.items():
+        page = doc[page_num]
+        for rect in merge_adjacent_rects(rects):
+            page.add_highlight_annot(rect)
 
     doc.save(output_path)
-    doc.close()
     print(f"PDF with highlights saved in: {output_path}")
 
 
@@ -195,28 +298,37 @@ def extract_account_number(full_text: str) -> str | None:
     Returns:
         The account number as a string, or None if not found.
     """    
-    default_account = re.compile(r"Account (?:number:|#)\s*([\d\s]+)")
-    match = default_account.search(full_text)
-
-    if match:
-        account_number = match.group(1).strip()
-        return account_number    
+    text_length = len(full_text)
+    start = full_text.find("Account ")
+    while start >= 0:
+        position = start + len("Account ")
+        for anchor in ("number:", "#"):
+            if full_text.startswith(anchor, position):
+                position += len(anchor)
+                end = position
+                while end < text_length and (full_text[end].isdecimal() or full_text[end].isspace()):
+                    end += 1
+                if end > position:
+                    account_number = full_text[position:end].strip()
+                    return account_number
+                break
+        start = full_text.find("Account ", start + 1)
     return None
 
 
-def structure_extract_in_json(full_text: str) -> str:
+def structure_extract_in_json(full_text: str) -> Dict:
     """
     Extracts information from a bank statement, makes the cardholder name dynamic
-    and structures the result into a formatted JSON string.
+    and structures the result into a JSON-serializable dictionary.
 
     Args:
         full_text: A string containing the entire bank statement.
 
     Returns:
-        A JSON-formatted string with the extracted data, or an error message.
+        A dictionary with the account holder, account summary, totals and transactions.
     """
     structured_data = {}
-    default_name = re.search(r"^([A-Z\s]+)\nAccount summary", full_text, re.MULTILINE)
+    default_name = RE_ACCOUNT_HOLDER.search(full_text)
     
     if default_name:
         structured_data["account_holder"] = default_name.group(1).strip()
@@ -224,8 +336,8 @@ def structure_extract_in_json(full_text: str) -> str:
         structured_data["account_holder"] = "Name not found"
 
 
-    def find_value(default, text, negative=False):
-        match = re.search(default, text)
+    def find_value(pattern: re.Pattern, text, negative=False):
+        match = pattern.search(text)
         if match:
             value_str = match.group(1).replace(',', '')
             value_float = float(value_str)
@@ -234,24 +346,24 @@ def structure_extract_in_json(full_text: str) -> str:
 
     account_summary = {
         "account_number": extract_account_number(full_text), 
-        "initial_balance": find_value(r"Beginning balance on .*? \$([\d,]+\.\d{2})", full_text),
-        "deposits_additions": find_value(r"Deposits and other (?:additions|credits)\s+([\d,]+\.\d{2})", full_text),
-        "card_withdrawals": find_value(r"ATM and debit card subtractions\s+-([\d,]+\.\d{2})", full_text, negative=True),
-        "other_withdrawals": find_value(r"Other subtractions\s+-([\d,]+\.\d{2})", full_text, negative=True) or find_value(r"Withdrawals and other debits\s+-([\d,]+\.\d{2})", full_text, negative=True),
-        "service_fees": find_value(r"Service fees\s+-([\d,]+\.\d{2})", full_text, negative=True),
-        "final_balance": find_value(r"Ending balance on .*? \$([\d,]+\.\d{2})", full_text)
+        "initial_balance": find_value(RE_BEGINNING_BALANCE, full_text),
+        "deposits_additions": find_value(RE_DEPOSITS, full_text),
+        "card_withdrawals": find_value(RE_CARD_WITHDRAWALS, full_text, negative=True),
+        "other_withdrawals": find_value(RE_OTHER_SUBTRACTIONS, full_text, negative=True) or find_value(RE_WITHDRAWALS, full_text, negative=True),
+        "service_fees": find_value(RE_SERVICE_FEES, full_text, negative=True),
+        "final_balance": find_value(RE_ENDING_BALANCE, full_text)
     }
     structured_data["account_summary"] = account_summary
 
     total_transactions = {
-        "total_deposits_additions": find_value(r"Total deposits and other (?:additions|credits)\s+\$([\d,]+\.\d{2})", full_text),
-        "total_card_withdrawals": find_value(r"Total ATM and debit card subtractions\s+-\$([\d,]+\.\d{2})", full_text, negative=True),
-        "total_other_withdrawals": find_value(r"Total (?:other subtractions|withdrawals and other debits)\s+-\$([\d,]+\.\d{2})", full_text, negative=True)
+        "total_deposits_additions": find_value(RE_TOTAL_DEPOSITS, full_text),
+        "total_card_withdrawals": find_value(RE_TOTAL_CARD_WITHDRAWALS, full_text, negative=True),
+        "total_other_withdrawals": find_value(RE_TOTAL_OTHER_WITHDRAWALS, full_text, negative=True)
     }
     structured_data["total_transactions"] = total_transactions
 
-    default = re.compile(r"^(\d{2}/\d{2}/\d{2})\s+.*?\s+(-?[\d,]+\.\d{2})$", re.MULTILINE)
-    matches = default.findall(full_text)
+    '''Transaction dates carry two slashes each, so skip the scan on text with fewer than two slashes'''
+    matches = RE_TRANSACTION.findall(full_text) if full_text.count("/") >= 2 else []
 
     transactions_list = []
     for date, value_str in matches:
@@ -267,12 +379,12 @@ def structure_extract_in_json(full_text: str) -> str:
     return structured_data
 
 
-def extract_bank_statement(pdf_path: str, DEFAULT_FONTS_BANK_OF_AMERICAN: set = None, bank_type: str = "BofA") -> Dict:
+def extract_bank_statement(full_text: str, DEFAULT_FONTS_BANK_OF_AMERICAN: set = None, bank_type: str = "BofA") -> Dict:
     """
-    Extracts key information from a PDF bank statement (focus on Bank of America Business Advantage).
+    Extracts key information from the text of a PDF bank statement (focus on Bank of America Business Advantage).
     
     Args:
-        pdf_path (str): Path to PDF file.
+        full_text (str): Full text of the PDF, as extracted by PyMuPDF.
         DEFAULT_FONTS_BANK_OF_AMERICAN (set, optional): Standard font set for anti-fraud validation.
         bank_type (str): Bank type ('BofA' para Bank of America).
     
@@ -280,108 +392,121 @@ def extract_bank_statement(pdf_path: str, DEFAULT_FONTS_BANK_OF_AMERICAN: set =
         Dict: Dictionary with extractions: client_name, transactions, balances, suspicious_info.
     """
     try:
-        with pdfplumber.open(pdf_path) as pdf:
-            full_text = ""
-            
-            for page in pdf.pages:
-                full_text += page.extract_text() or ""
-            
-            result = structure_extract_in_json(full_text)
-            return result
+        result = structure_extract_in_json(full_text)
+        return result
     
     except Exception as e:
         return {"error": f"Error processing PDF: {str(e)}"}
 
 
-@app.post("/analyze-pdf")
-async def analyze_pdf(files: List[UploadFile] = File(...)):
-    final_result = []
-    for file in files:
-        """Analyzes metadata, images and internal structure of PDFs."""
-        if not file.filename.endswith(".pdf"):
-            raise HTTPException(status_code=400, detail="Only PDF files are supported.")
-
-        temp_file_path = "temp.pdf"
-        try:
-            content = await file.read()
-
-            with open(temp_file_path, "wb") as temp_file:
-                temp_file.write(content)
-
-            pdf = fitz.open(stream=content, filetype="pdf")
-            metadata_orig = pdf.metadata
-            pdf.close()
+def process_pdf(upload: BinaryIO, filename: str) -> Dict:
+    """Analyzes metadata, images and internal structure of a single PDF (blocking)."""
+    temp_file_path = None
+    try:
+        '''Stream the upload to a per-request temp file in chunks instead of holding it in memory'''
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as temp_file:
+            temp_file_path = temp_file.name
+            shutil.copyfileobj(upload, temp_file, 1 << 20)
 
-            metadata_extracted = extract_metadata(metadata_orig)            
-            creation_date = format_pdf_date(metadata_orig.get("creationDate"))
-            mod_date = format_pdf_date(metadata_orig.get("modDate"))
-            producer = metadata_orig.get("producer") 
-            creator = metadata_orig.get("creator")
-            author = metadata_orig.get("author")
-    
+        '''PyMuPDF is not thread-safe, so all fitz work for a document happens under FITZ_LOCK'''
+        with FITZ_LOCK, fitz.open(temp_file_path) as doc:
+            metadata_orig = doc.metadata
 
-            image_analysis = []
-            doc = fitz.open(stream=content, filetype="pdf")
+            image_occurrences = []
+            image_data_by_xref = {}
             for page_num in range(len(doc)):
                 page = doc[page_num]
                 images = page.get_images(full=True)
                 for img_index, img in enumerate(images):
                     xref = img[0]
-                    base_image = doc.extract_image(xref)
-                    image_data = base_image["image"]
-                    image_result = analyze_image(image_data)
-                    image_analysis.append({
-                        "page": page_num + 1,
-                        "image_index": img_index,
-                        "analysis": image_result
-                    })
+                    '''Images reused across pages (logos, headers) share an xref, so extract and analyze them once'''
+                    if xref not in image_data_by_xref:
+                        base_image = doc.extract_image(xref)
+                        image_data_by_xref[xref] = base_image["image"]
+                    image_occurrences.append((page_num, img_index, xref))
 
-            doc.close()
+            full_text = "\n".join([extract_page_text(page) for page in doc])
+            low_level_analysis = parse_pdf_low_level(doc)
 
-            low_level_analysis = parse_pdf_low_level(temp_file_path)
-
-            analysed_file_name = f"analyzed_{file.filename}"
+            '''Unique prefix so uploads sharing a filename don't overwrite each other's output'''
+            analysed_file_name = f"analyzed_{uuid.uuid4().hex[:8]}_{filename}"
             highlight_suspicious_fonts(
-                pdf_path=temp_file_path, 
+                doc=doc, 
                 suspicious_regions=low_level_analysis.get('suspicious_regions'), 
                 output_path=analysed_file_name
             )
 
-            result = extract_bank_statement(temp_file_path)
-
-            possible_edits = {
-                "edited_by_dates": metadata_extracted["analysis_editions"]["edited_by_dates"],
-                "edited_by_software": metadata_extracted["analysis_editions"]["edited_by_software"],
-                "image_analysis_summary": any(img["analysis"].get("possible_manipulation", False) for img in image_analysis),
-                "low_level_analysis_summary": low_level_analysis.get("suspicious_objects", False),
-                "summary": "Possible edit detected" if (
-                    metadata_extracted["analysis_editions"]["edited_by_dates"] or
-                    metadata_extracted["analysis_editions"]["edited_by_software"] or
-                    any(img["analysis"].get("possible_manipulation", False) for img in image_analysis) or
-                    sorted(DEFAULT_FONTS_BANK_OF_AMERICAN) != sorted(low_level_analysis.get("fontes_used", []))
-                ) else "No obvious edits detected."
+        metadata_extracted = extract_metadata(metadata_orig)            
+        creation_date = format_pdf_date(metadata_orig.get("creationDate"))
+        mod_date = format_pdf_date(metadata_orig.get("modDate"))
+        producer = metadata_orig.get("producer") 
+        creator = metadata_orig.get("creator")
+        author = metadata_orig.get("author")
+
+        '''ELA runs in OpenCV/Numba without touching fitz and releases the GIL, so images are analyzed in parallel'''
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            image_results = dict(zip(
+                image_data_by_xref,
+                executor.map(analyze_image, image_data_by_xref.values())
+            ))
+
+        image_analysis = [
+            {
+                "page": page_num + 1,
+                "image_index": img_index,
+                "analysis": image_results[xref]
             }
-            
-            final_result.append({
-                "metadata": {
-                    "file_name": file.filename,
-                    "analysed_file_name": analysed_file_name,
-                    "creation_date": creation_date,
-                    "modification_date": mod_date,
-                    "producer": producer,
-                    "creator": creator,
-                    "author": author
-                },
-                "low_level_analysis": low_level_analysis,
-                "analysis_editions": possible_edits,
-                "bank_result": result,
-                "image_analysis": image_analysis
-            })
-
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Error processing PDF: {str(e)}")
-        finally:
-            if os.path.exists(temp_file_path):
-               os.remove(temp_file_path)
+            for page_num, img_index, xref in image_occurrences
+        ]
+
+        result = extract_bank_statement(full_text)
+
+        edited_by_dates = metadata_extracted["analysis_editions"]["edited_by_dates"]
+        edited_by_software = metadata_extracted["analysis_editions"]["edited_by_software"]
+        image_manipulation = any(img["analysis"].get("possible_manipulation", False) for img in image_analysis)
+        font_mismatch = not DEFAULT_FONTS_BANK_OF_AMERICAN.issuperset(low_level_analysis.get("fonts_used", ()))
+        possible_edit = edited_by_dates or edited_by_software or image_manipulation or font_mismatch
+
+        possible_edits = {
+            "edited_by_dates": edited_by_dates,
+            "edited_by_software": edited_by_software,
+            "image_analysis_summary": image_manipulation,
+            "low_level_analysis_summary": low_level_analysis.get("suspicious_objects", False),
+            "summary": "Possible edit detected" if possible_edit else "No obvious edits detected."
+        }
+        
+        return {
+            "metadata": {
+                "file_name": filename,
+                "analysed_file_name": analysed_file_name,
+                "creation_date": creation_date,
+                "modification_date": mod_date,
+                "producer": producer,
+                "creator": creator,
+                "author": author
+            },
+            "low_level_analysis": low_level_analysis,
+            "analysis_editions": possible_edits,
+            "bank_result": result,
+            "image_analysis": image_analysis
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing PDF: {str(e)}")
+    finally:
+        if temp_file_path and os.path.exists(temp_file_path):
+           os.remove(temp_file_path)
+
+
+@app.post("/analyze-pdf")
+async def analyze_pdf(files: List[UploadFile] = File(...)):
+    """Analyzes metadata, images and internal structure of PDFs."""
+    for file in files:
+        if not file.filename.endswith(".pdf"):
+            raise HTTPException(status_code=400, detail="Only PDF files are supported.")
+
+    '''Run the blocking PDF pipeline in worker threads to keep the event loop free'''
+    final_result = await asyncio.gather(
+        *(asyncio.to_thread(process_pdf, file.file, file.filename) for file in files)
+    )
     
     return final_result
\ No newline at end of file